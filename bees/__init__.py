@@ -3,6 +3,7 @@ import collections
 import json
 import os
 import time
+import zlib
 
 import aiohttp
 import psutil
@@ -10,28 +11,140 @@ from pyformance.registry import MetricsRegistry
 
 import curlparser
 
+from .codec import FrameEncoder
+
 MAX_COLD_START_TIME = 20
+RESULT_RETENTION_TIME = 1800
+# the collector backs off when a tick plus the loop lag it measured exceeds
+# this share of its interval, up to MAX_COLLECTOR_BACKOFF times the base
+COLLECTOR_BUSY_RATIO = 0.1
+MAX_COLLECTOR_BACKOFF = 8
+MIN_COLLECTOR_INTERVAL = 0.01
 PID = os.getpid()
 CURRENT_PROC = psutil.Process(PID)
 
 
 def _make_metrics_registry() -> MetricsRegistry:
     registry = MetricsRegistry()
-    registry.counter("user")
     registry.counter("request.total")
     registry.counter("request.error")
-    registry.gauge("request.active")
     registry.histogram("response.latency")
     return registry
 
 
+class _MetricsBuffer:
+    __slots__ = ("requests", "errors", "latencies", "error_counts")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latencies: list[float] = []
+        self.error_counts: collections.Counter[str] = collections.Counter()
+
+    def add_response(self, latency: float, error: str | None = None) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+        if error is not None:
+            self.add_error(error)
+
+    def add_error(self, error: str) -> None:
+        self.errors += 1
+        self.error_counts[error] += 1
+
+
+class _Recorder:
+    """What users of one benchmark write to.
+
+    Responses go into ``buffer``. The collector replaces it with ``swap``,
+    which is atomic on the event loop, and folds the old buffer into
+    ``METRICS`` in a worker thread, so users never touch the registry.
+    """
+
+    def __init__(self):
+        self.users = 0
+        self.active = 0
+        self.buffer = _MetricsBuffer()
+
+    def swap(self) -> _MetricsBuffer:
+        buffer, self.buffer = self.buffer, _MetricsBuffer()
+        return buffer
+
+
 METRICS = collections.defaultdict(_make_metrics_registry)
+RECORDERS = collections.defaultdict(_Recorder)
 DATAS = collections.defaultdict(list)
 NOTI_HAS_DATA = collections.defaultdict(asyncio.Event)
 NOTI_RUNNING = collections.defaultdict(asyncio.Event)
 NOTI_STOPPING = collections.defaultdict(asyncio.Event)
 
 
+class TokenBucket:
+    """Async token bucket scheduled on the monotonic clock.
+
+    Tokens accrue at ``rate`` per second up to ``burst``. ``reserve`` takes a
+    token immediately, letting the balance go negative, and returns how long
+    the caller has to wait for it. Reservations therefore follow a fixed
+    schedule: oversleeping by one waiter shortens the next wait instead of
+    drifting the achieved rate below the target.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+def _target_rate(
+    rate: float | None, pacing: float | None, users: int
+) -> float | None:
+    targets = []
+    if rate:
+        targets.append(rate)
+    if pacing:
+        targets.append(users / pacing)
+    return min(targets) if targets else None
+
+
+async def _sleep_unless_stopped(request_id: str, delay: float) -> bool:
+    """Sleep for ``delay`` seconds, returning True early if the benchmark stops."""
+    if delay <= 0:
+        return NOTI_STOPPING[request_id].is_set()
+    try:
+        await asyncio.wait_for(NOTI_STOPPING[request_id].wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def _control_benchmark(request_id: str, command: str) -> str:
+    if command == "stop":
+        NOTI_STOPPING[request_id].set()
+        return "stopped"
+    if NOTI_STOPPING[request_id].is_set():
+        return "stopped"
+    if command == "pause":
+        NOTI_RUNNING[request_id].clear()
+        return "paused"
+    if command == "resume":
+        NOTI_RUNNING[request_id].set()
+        return "running"
+    raise ValueError(f"Unknown command: {command}")
+
+
 def _get_status(request_id: str):
     if NOTI_STOPPING[request_id].is_set():
         return "stopped"
@@ -41,26 +154,87 @@ def _get_status(request_id: str):
         return "paused"
 
 
-async def _data_collector_loop(request_id: str, interval: int = 2):
+def _fold_metrics(
+    registry: MetricsRegistry,
+    errors: collections.Counter,
+    buffer: _MetricsBuffer,
+) -> dict:
+    """Fold a swapped out buffer into the registry and summarize it.
+
+    Runs in a worker thread, off the event loop the users run on.
+    """
+    registry.counter("request.total").inc(buffer.requests)
+    registry.counter("request.error").inc(buffer.errors)
+    histogram = registry.histogram("response.latency")
+    for latency in buffer.latencies:
+        histogram.add(latency)
+    errors.update(buffer.error_counts)
+
+    snapshot = histogram.get_snapshot()
+    error_infos = errors.most_common()
+    return {
+        "total": registry.counter("request.total").get_count(),
+        "errors": registry.counter("request.error").get_count(),
+        "max": histogram.get_max(),
+        "p99": snapshot.get_99th_percentile(),
+        "median": snapshot.get_median(),
+        "mean": histogram.get_mean(),
+        "cpu_percent": CURRENT_PROC.cpu_percent(interval=None),
+        "error_table": [
+            [k.split(".", maxsplit=1)[0] for k, _ in error_infos],
+            [k.split(".", maxsplit=1)[1] for k, _ in error_infos],
+            [v for _, v in error_infos],
+        ],
+    }
+
+
+async def _data_collector_loop(
+    request_id: str,
+    interval: float = 2,
+    rate: float | None = None,
+    pacing: float | None = None,
+    users: int = 0,
+):
+    loop = asyncio.get_running_loop()
+    interval = max(interval, MIN_COLLECTOR_INTERVAL)
     try:
+        recorder = RECORDERS[request_id]
+        errors = collections.Counter()
         last_total = 0
         last_total_errors = 0
         start_time = time.time()
+        current_interval = interval
+        last_tick = time.monotonic()
+        lag = 0.0
         while True:
+            tick_start = time.monotonic()
+            buffer = recorder.swap()
             if not NOTI_RUNNING[request_id].is_set():  # paused
                 METRICS[request_id] = _make_metrics_registry()
+                errors = collections.Counter()
+                buffer = _MetricsBuffer()
                 last_total = 0
                 last_total_errors = 0
             registry = METRICS[request_id]
+            elapsed = max(tick_start - last_tick, 1e-3)
+            last_tick = tick_start
+
+            loop_cost = time.monotonic() - tick_start
+            offload_start = time.monotonic()
+            summary = await loop.run_in_executor(
+                None, _fold_metrics, registry, errors, buffer
+            )
+            offload_cost = time.monotonic() - offload_start
+            append_start = time.monotonic()
             now = int((time.time() - start_time) * 100) / 100
 
-            total = registry.counter("request.total").get_count()
+            total = summary["total"]
             DATAS[request_id].append(
                 {
                     "plot": "throughput",
                     "data": {
                         "x": [[now]],
-                        "y": [[(total - last_total) / interval]],
+                        "y": [[(total - last_total) / elapsed]],
                     },
                     "trace": 0,
                     "operation": "extend",
@@ -68,13 +242,13 @@ async def _data_collector_loop(request_id: str, interval: int = 2):
             )
             last_total = total
 
-            total = registry.counter("request.error").get_count()
+            total = summary["errors"]
             DATAS[request_id].append(
                 {
                     "plot": "throughput",
                     "data": {
                         "x": [[now]],
-                        "y": [[(total - last_total_errors) / interval]],
+                        "y": [[(total - last_total_errors) / elapsed]],
                     },
                     "trace": 1,
                     "operation": "extend",
@@ -82,64 +256,50 @@ async def _data_collector_loop(request_id: str, interval: int = 2):
             )
             last_total_errors = total
 
-            if registry.counter("request.total").get_count() > 0:
-                # latency metrics
-                DATAS[request_id].append(
-                    {
-                        "plot": "latency",
-                        "data": {
-                            "x": [[now]],
-                            "y": [[registry.histogram("response.latency").get_max()]],
-                        },
-                        "trace": 0,
-                        "operation": "extend",
-                    }
-                )
-                DATAS[request_id].append(
-                    {
-                        "plot": "latency",
-                        "data": {
-                            "x": [[now]],
-                            "y": [
-                                [
-                                    registry.histogram("response.latency")
-                                    .get_snapshot()
-                                    .get_99th_percentile()
-                                ]
-                            ],
-                        },
-                        "trace": 1,
-                        "operation": "extend",
-                    }
-                )
+            # configured users, so the line ignores cold start and shutdown
+            target = _target_rate(rate, pacing, users)
+            if target is not None:
                 DATAS[request_id].append(
                     {
-                        "plot": "latency",
+                        "plot": "throughput",
                         "data": {
                             "x": [[now]],
-                            "y": [
-                                [
-                                    registry.histogram("response.latency")
-                                    .get_snapshot()
-                                    .get_median()
-                                ]
-                            ],
+                            "y": [[target]],
                         },
                         "trace": 2,
                         "operation": "extend",
                     }
                 )
 
+            if summary["total"] > 0:
+                # latency metrics
+                for trace, key in enumerate(("max", "p99", "median")):
+                    DATAS[request_id].append(
+                        {
+                            "plot": "latency",
+                            "data": {
+                                "x": [[now]],
+                                "y": [[summary[key]]],
+                            },
+                            "trace": trace,
+                            "operation": "extend",
+                        }
+                    )
+
+            loop_cost += time.monotonic() - append_start
             DATAS[request_id].append(
                 {
                     "plot": "system",
                     "data": [
                         [_get_status(request_id)],
-                        [registry.counter("user").get_count()],
-                        [registry.counter("request.total").get_count()],
-                        [registry.counter("request.error").get_count()],
-                        [registry.histogram("response.latency").get_mean()],
-                        [f"{CURRENT_PROC.cpu_percent(interval=None)}%"],
+                        [recorder.users],
+                        [summary["total"]],
+                        [summary["errors"]],
+                        [summary["mean"]],
+                        [f"{summary['cpu_percent']}%"],
+                        [current_interval],
+                        [f"{loop_cost * 1000:.2f} / {offload_cost * 1000:.2f}"],
+                        [round(lag * 1000, 2)],
                     ],
                     "trace": 0,
                     "operation": "replace",
@@ -147,22 +307,10 @@ async def _data_collector_loop(request_id: str, interval: int = 2):
             )
 
             # error metrics
-            error_metrics = tuple(
-                k for k in registry.dump_metrics() if k.startswith("error.")
-            )
-            error_infos = [
-                (k.split(".", maxsplit=1)[1], registry.counter(k).get_count())
-                for k in error_metrics
-            ]
-            error_infos.sort(key=lambda x: x[1], reverse=True)
             DATAS[request_id].append(
                 {
                     "plot": "error",
-                    "data": [
-                        [k.split(".", maxsplit=1)[0] for k, _ in error_infos],
-                        [k.split(".", maxsplit=1)[1] for k, _ in error_infos],
-                        [v for _, v in error_infos],
-                    ],
+                    "data": summary["error_table"],
                     "trace": 0,
                     "operation": "replace",
                 }
@@ -172,7 +320,21 @@ async def _data_collector_loop(request_id: str, interval: int = 2):
                 return
             if not NOTI_RUNNING[request_id].is_set():  # paused
                 await NOTI_RUNNING[request_id].wait()  # wait for resume
-            await asyncio.sleep(interval)
+                last_tick = time.monotonic()
+
+            # back off while the loop is busy, return to the base interval after
+            busy = lag + loop_cost
+            if busy > current_interval * COLLECTOR_BUSY_RATIO:
+                current_interval = min(
+                    current_interval * 2, interval * MAX_COLLECTOR_BACKOFF
+                )
+            elif busy < current_interval * COLLECTOR_BUSY_RATIO / 4:
+                current_interval = max(current_interval / 2, interval)
+            deadline = time.monotonic() + current_interval
+            if await _sleep_unless_stopped(request_id, current_interval):
+                lag = 0.0  # woken early by stop, take the final tick now
+            else:
+                lag = max(time.monotonic() - deadline, 0.0)
     except Exception as e:
         DATAS[request_id].append(
             {
@@ -208,55 +370,150 @@ async def _stream_chart_data(request_id: str):
             await NOTI_HAS_DATA[request_id].wait()
 
 
+async def _stream_chart_frames(request_id: str):
+    encoder = FrameEncoder(PLOTS_RESULT)
+    cursor = 0
+    while True:
+        datas = DATAS[request_id]
+        if cursor < len(datas):
+            updates = []
+            while cursor < len(datas):
+                updates.append(datas[cursor])
+                cursor += 1
+                if updates[-1] is None:
+                    break
+            frame = encoder.encode(updates)
+            if frame:
+                yield frame
+            if updates[-1] is None:
+                return
+        else:
+            NOTI_HAS_DATA[request_id].clear()
+            await NOTI_HAS_DATA[request_id].wait()
+
+
+async def _gzip_stream(chunks):
+    """Gzip an event stream, flushing after each chunk so events are not delayed."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _request_body(request_info: curlparser.parser.ParsedCommand):
+    if not request_info.form:
+        return request_info.data
+    # like curl, -F is always multipart; a writer can only be sent once, so
+    # build it for every request
+    writer = aiohttp.MultipartWriter("form-data")
+    for name, value in request_info.form:
+        part = writer.append(value)
+        part.set_content_disposition("form-data", name=name)
+    return writer
+
+
+def _session_options(
+    request_info: curlparser.parser.ParsedCommand, timeout_override: int | None
+) -> dict:
+    return {
+        "timeout": aiohttp.ClientTimeout(
+            total=timeout_override or request_info.max_time,
+            connect=request_info.connect_timeout,
+        ),
+        "version": (
+            aiohttp.HttpVersion10
+            if request_info.http_version == "1.0"
+            else aiohttp.HttpVersion11
+        ),
+        # like curl, only ask for a compressed response with --compressed
+        "skip_auto_headers": (
+            () if request_info.compressed else ("Accept-Encoding",)
+        ),
+    }
+
+
+def _request_options(request_info: curlparser.parser.ParsedCommand) -> dict:
+    return {
+        "method": request_info.method,
+        "url": request_info.url,
+        "headers": request_info.headers,
+        "data": _request_body(request_info),
+        "cookies": request_info.cookies,
+        "auth": aiohttp.BasicAuth(*request_info.auth) if request_info.auth else None,
+        "allow_redirects": request_info.allow_redirects,
+        "max_redirects": request_info.max_redirects,
+        "ssl": None if request_info.verify else False,
+        "proxy": request_info.proxy,
+    }
+
+
 async def _user_loop(
     request_id: str,
     request_info: curlparser.parser.ParsedCommand,
     timeout_override: int | None,
     start_delay: float = 0,
+    limiter: TokenBucket | None = None,
+    pacing: float | None = None,
 ) -> None:
     await asyncio.sleep(start_delay)
     dummy_cookie_jar = aiohttp.DummyCookieJar()
-    METRICS[request_id].counter("user").inc()
-    timeout = timeout_override or request_info.max_time
+    recorder = RECORDERS[request_id]
+    recorder.users += 1
+    session_options = _session_options(request_info, timeout_override)
+    pacer = TokenBucket(1 / pacing) if pacing else None
     while True:
         if NOTI_STOPPING[request_id].is_set():  # stopped
-            METRICS[request_id].counter("user").dec()
+            recorder.users -= 1
             return
         if not NOTI_RUNNING[request_id].is_set():  # paused
-            METRICS[request_id].counter("user").dec()
+            recorder.users -= 1
             await NOTI_RUNNING[request_id].wait()
             await asyncio.sleep(start_delay)
-            METRICS[request_id].counter("user").inc()
+            recorder.users += 1
+        if pacer is not None:
+            if await _sleep_unless_stopped(request_id, pacer.reserve()):
+                continue
+            if not NOTI_RUNNING[request_id].is_set():  # paused while waiting
+                continue
+        if limiter is not None:
+            if await _sleep_unless_stopped(request_id, limiter.reserve()):
+                continue
+            if not NOTI_RUNNING[request_id].is_set():  # paused while waiting
+                continue
         try:
-            METRICS[request_id].counter("request.active").inc()
+            recorder.active += 1
             async with aiohttp.ClientSession(
                 cookie_jar=dummy_cookie_jar,
-                timeout=aiohttp.ClientTimeout(total=timeout),
+                **session_options,
             ) as session:
                 now = time.time()
                 async with session.request(
-                    method=request_info.method,
-                    url=request_info.url,
-                    headers=request_info.headers,
-                    data=request_info.data,
-                    cookies=request_info.cookies,
-                    timeout=timeout,
+                    **_request_options(request_info)
                 ) as response:
                     content = await response.read()
                     abstract = content.decode()[:50]
-                METRICS[request_id].histogram("response.latency").add(time.time() - now)
-                METRICS[request_id].counter("request.total").inc()
+                error = None
                 if response.status >= 400 and response.status < 600:
-                    METRICS[request_id].counter("request.error").inc()
-                    METRICS[request_id].counter(
-                        f"error.{response.status}.{abstract}"
-                    ).inc()
+                    error = f"{response.status}.{abstract}"
+                # the buffer is looked up per response, the collector swaps it
+                recorder.buffer.add_response(time.time() - now, error)
         except Exception as e:
             abstract = str(e)[:50]
-            METRICS[request_id].counter(f"error.{type(e).__name__}.{abstract}").inc()
-            METRICS[request_id].counter("request.error").inc()
+            recorder.buffer.add_error(f"{type(e).__name__}.{abstract}")
         finally:
-            METRICS[request_id].counter("request.active").dec()
+            recorder.active -= 1
+
+
+def _clear_result(result_id: str) -> None:
+    for registry in (
+        METRICS,
+        RECORDERS,
+        DATAS,
+        NOTI_HAS_DATA,
+        NOTI_RUNNING,
+        NOTI_STOPPING,
+    ):
+        registry.pop(result_id, None)
 
 
 async def _benchmark_controller(
@@ -266,13 +523,45 @@ async def _benchmark_controller(
     duration: int,
     timeout_override: int | None = None,
     collector_interval: int = 2,
+    rate: float | None = None,
+    burst: int = 1,
+    pacing: float | None = None,
 ):
     if result_id in METRICS:
         return
+    try:
+        await _run_benchmark(
+            result_id,
+            code,
+            users,
+            duration,
+            timeout_override,
+            collector_interval,
+            rate,
+            burst,
+            pacing,
+        )
+    finally:
+        await asyncio.sleep(RESULT_RETENTION_TIME)
+        _clear_result(result_id)
+
+
+async def _run_benchmark(
+    result_id: str,
+    code,
+    users: int | None,
+    duration: int,
+    timeout_override: int | None = None,
+    collector_interval: int = 2,
+    rate: float | None = None,
+    burst: int = 1,
+    pacing: float | None = None,
+):
     if users is None:
         users = 10
     parsed = curlparser.parse(code)
     cold_start_time = min(duration / 3, MAX_COLD_START_TIME)
+    limiter = TokenBucket(rate, burst) if rate else None
 
     tasks: list[asyncio.Task] = []
     try:
@@ -281,6 +570,9 @@ async def _benchmark_controller(
                 _data_collector_loop(
                     result_id,
                     collector_interval,
+                    rate,
+                    pacing,
+                    users,
                 ),
                 name=f"collector-{result_id}",
             )
@@ -293,6 +585,8 @@ async def _benchmark_controller(
                         parsed,
                         timeout_override,
                         start_delay=cold_start_time / users * i,
+                        limiter=limiter,
+                        pacing=pacing,
                     ),
                     name=f"user-{result_id}-{i}",
                 ),
@@ -314,80 +608,158 @@ async def _benchmark_controller(
                 task, timeout=(timeout_override or parsed.max_time or 10) + 1
             )
 
-        await asyncio.sleep(1800)
-
-        # clean
-        if result_id in METRICS:
-            METRICS.pop(result_id)
-        if result_id in METRICS:
-            METRICS.pop(result_id)
-        if result_id in DATAS:
-            DATAS.pop(result_id)
-        if result_id in NOTI_HAS_DATA:
-            NOTI_HAS_DATA.pop(result_id)
-        if result_id in NOTI_RUNNING:
-            NOTI_RUNNING.pop(result_id)
-        if result_id in NOTI_STOPPING:
-            NOTI_STOPPING.pop(result_id)
-
 
 TEMPLATE_RESULT = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Bees: Benchmark Result</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <script src="{{ plotly_url }}"></script>
+    <script src="{{ assets['plots.js'].url }}"></script>
+    <script src="{{ assets['chart.js'].url }}" defer></script>
 </head>
-<body>
-<button onclick="fetch('/pause_bento_benchmark', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({result_id: '{{ chart_id }}'})})">Pause</button>
-<button onclick="fetch('/resume_bento_benchmark', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({result_id: '{{ chart_id }}'})})">Resume</button>
-<button onclick="fetch('/stop_bento_benchmark', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({result_id: '{{ chart_id }}'})})">Stop</button>
-
-{% for plot in plots %}
-    <div id="{{ plot.name }}"></div>
-{% endfor %}
-
-<script>
-    var plots = {{ plots | tojson }};
-    var plotMap = {};
-    for (var i = 0; i < plots.length; i++) {
-        var plot = plots[i];
-        Plotly.newPlot(plot.name, plot.traces, plot.layout);
-        plotMap[plot.name] = plot;
-    }
+<body data-chart-id="{{ chart_id }}">
+<button onclick="control('pause')">Pause</button>
+<button onclick="control('resume')">Resume</button>
+<button onclick="control('stop')">Stop</button>
+<div id="plots"></div>
+</body>
+</html>
+        """
 
-    var source = new EventSource('/chart/{{ chart_id }}/stream');
-    source.onmessage = function(event) {
-        var data = JSON.parse(event.data);
-        var plot = plotMap[data.plot];
-        if (plot.traces[data.trace].type === 'table') {
-            if (data.operation === 'extend') {
-                for (var i = 0; i < data.data.length; i++) {
-                    plot.traces[data.trace].cells.values[i].push(data.data[i][0]);
-                }
-            } else {
-                plot.traces[data.trace].cells.values = data.data;
+
+SCRIPT_CHART = """
+var chartId = document.body.dataset.chartId;
+var controlSocket = null;
+
+function control(action) {
+    if (controlSocket !== null && controlSocket.readyState === WebSocket.OPEN) {
+        controlSocket.send(action);
+        return;
+    }
+    fetch('/' + action + '_bento_benchmark', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({result_id: chartId}),
+    });
+}
+
+var plotMap = {};
+var plotNames = [];
+for (var i = 0; i < PLOTS.length; i++) {
+    var plot = PLOTS[i];
+    var div = document.createElement('div');
+    div.id = plot.name;
+    document.getElementById('plots').appendChild(div);
+    Plotly.newPlot(plot.name, plot.traces, plot.layout);
+    plotMap[plot.name] = plot;
+    plotNames.push(plot.name);
+}
+
+function applyUpdate(data) {
+    var plot = plotMap[data.plot];
+    if (plot.traces[data.trace].type === 'table') {
+        if (data.operation === 'extend') {
+            for (var i = 0; i < data.data.length; i++) {
+                plot.traces[data.trace].cells.values[i].push(data.data[i][0]);
             }
+        } else {
+            plot.traces[data.trace].cells.values = data.data;
+        }
+        Plotly.react(plot.name, plot.traces, plot.layout);
+    } else {
+        if (data.operation === 'replace') {
+            plot.traces[data.trace].x = data.data.x[0];
+            plot.traces[data.trace].y = data.data.y[0];
             Plotly.react(plot.name, plot.traces, plot.layout);
         } else {
-            if (data.operation === 'replace') {
-                plot.traces[data.trace].x = data.data.x[0];
-                plot.traces[data.trace].y = data.data.y[0];
-                Plotly.react(plot.name, plot.traces, plot.layout);
-            } else {
-                Plotly.extendTraces(data.plot, data.data, [data.trace]);
-            }
+            Plotly.extendTraces(data.plot, data.data, [data.trace]);
         }
+    }
+}
+
+// decoder for the binary frames described in bees/codec.py
+var frameTime = 0;
+var textDecoder = new TextDecoder();
+function decodeJSON(buffer, offset, length) {
+    return JSON.parse(textDecoder.decode(new Uint8Array(buffer, offset, length)));
+}
+function decodeFrame(buffer) {
+    var view = new DataView(buffer);
+    var offset = 0;
+    var updates = [];
+    while (offset < view.byteLength) {
+        var kind = view.getUint8(offset);
+        if (kind === 0) {
+            frameTime += view.getInt32(offset + 1, true);
+            offset += 5;
+        } else if (kind === 1) {
+            updates.push({
+                plot: plotNames[view.getUint8(offset + 1)],
+                trace: view.getUint8(offset + 2),
+                operation: 'extend',
+                data: {x: [[frameTime / 100]], y: [[view.getFloat32(offset + 3, true)]]},
+            });
+            offset += 7;
+        } else if (kind === 2) {
+            var length = view.getUint32(offset + 3, true);
+            updates.push({
+                plot: plotNames[view.getUint8(offset + 1)],
+                trace: view.getUint8(offset + 2),
+                operation: 'replace',
+                data: decodeJSON(buffer, offset + 7, length),
+            });
+            offset += 7 + length;
+        } else if (kind === 3) {
+            var length = view.getUint32(offset + 1, true);
+            updates.push(decodeJSON(buffer, offset + 5, length));
+            offset += 5 + length;
+        } else {
+            offset += 1;
+        }
+    }
+    return updates;
+}
+
+function connectEventSource() {
+    var source = new EventSource('/chart/' + chartId + '/stream');
+    source.onmessage = function(event) {
+        applyUpdate(JSON.parse(event.data));
     };
     source.addEventListener('close', function(event) {
         source.close();
     });
+}
 
-</script>
+function connectWebSocket() {
+    if (!window.WebSocket) {
+        connectEventSource();
+        return;
+    }
+    var protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+    var socket = new WebSocket(protocol + '//' + location.host + '/chart/' + chartId + '/ws');
+    var opened = false;
+    socket.binaryType = 'arraybuffer';
+    socket.onopen = function() {
+        opened = true;
+        controlSocket = socket;
+    };
+    socket.onmessage = function(event) {
+        if (typeof event.data === 'string') {
+            return;  // control acknowledgement
+        }
+        decodeFrame(event.data).forEach(applyUpdate);
+    };
+    socket.onclose = function() {
+        controlSocket = null;
+        if (!opened) {
+            connectEventSource();
+        }
+    };
+}
 
-</body>
-</html>
-        """
+connectWebSocket();
+"""
 
 
 TEMPLATE_INDEX = r"""
@@ -402,6 +774,9 @@ TEMPLATE_INDEX = r"""
                     var code = form.elements["code"].value;
                     var timeout = form.elements["timeout"].value;
                     var interval = form.elements["interval"].value;
+                    var rate = form.elements["rate"].value || null;
+                    var burst = form.elements["burst"].value || 1;
+                    var pacing = form.elements["pacing"].value || null;
                     if (users < 1 || duration < 1) {
                         alert("Users and duration must be greater than 0");
                         return;
@@ -418,8 +793,15 @@ TEMPLATE_INDEX = r"""
                             duration: duration,
                             timeout: timeout,
                             interval: interval,
+                            rate: rate,
+                            burst: burst,
+                            pacing: pacing,
                         }),
                     }).then(response => response.json()).then(data => {
+                        if (data.status === "error") {
+                            alert(data.error);
+                            return;
+                        }
                         window.location.href = data.result;
                     });
                 }
@@ -439,7 +821,13 @@ TEMPLATE_INDEX = r"""
             <label for="timeout">Timeout:(s)</label><br>
             <input type="number" id="timeout" name="timeout" value="60"><br>
             <label for="interval">Collector Interval:(s)</label><br>
-            <input type="number" id="interval" name="interval" value="2"><br><br>
+            <input type="number" id="interval" name="interval" value="2"><br>
+            <label for="rate">Total Rate Limit:(requests/s, optional)</label><br>
+            <input type="number" id="rate" name="rate" step="any"><br>
+            <label for="burst">Rate Limit Burst:</label><br>
+            <input type="number" id="burst" name="burst" value="1"><br>
+            <label for="pacing">Per-user Pacing:(s between requests, optional)</label><br>
+            <input type="number" id="pacing" name="pacing" step="any"><br><br>
             <input type="submit" value="Submit">
         </form>
         </body>
@@ -460,6 +848,9 @@ PLOTS_RESULT = [
                         "Errors",
                         "Average Latency(s)",
                         "Client CPU Usage",
+                        "Collector Interval(s)",
+                        "Tick Cost on/off Loop(ms)",
+                        "Event Loop Lag(ms)",
                     ],
                     "align": "center",
                     "line": {"width": 1, "color": "black"},
@@ -500,6 +891,14 @@ PLOTS_RESULT = [
                 "line": {"color": "red"},
                 "name": "error",
             },
+            {
+                "x": [],
+                "y": [],
+                "mode": "lines",
+                "type": "scatter",
+                "line": {"color": "grey", "dash": "dash"},
+                "name": "target",
+            },
         ],
         "layout": {
             "title": "Throughput",
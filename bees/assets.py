@@ -0,0 +1,119 @@
+import dataclasses
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # fall back to gzip only
+    brotli = None
+
+PLOTLY_CDN_URL = "https://cdn.plot.ly/plotly-latest.min.js"
+PLOTLY_JS_ENV = "BEES_PLOTLY_JS"
+# assets are compressed at import in every worker; the default quality 11
+# takes tens of seconds on the Plotly bundle, 5 is about as fast as gzip -9
+BROTLI_QUALITY = 5
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows ``coding``, honouring q=0."""
+    wildcard = False
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if name not in (coding, "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == coding:
+            return q > 0
+        wildcard = q > 0
+    return wildcard
+
+
+@dataclasses.dataclass(frozen=True)
+class StaticAsset:
+    name: str
+    content_type: str
+    body: bytes
+    gzip: bytes
+    br: bytes | None
+    etag: str
+
+    @property
+    def url(self) -> str:
+        # the digest in the query string makes the URL safe to cache forever
+        return f"/static/{self.name}?v={self.etag[1:13]}"
+
+    def encoded(self, accept_encoding: str) -> tuple[bytes, str | None, str]:
+        """Pick the smallest encoding the client accepts.
+
+        Returns the body, its content encoding and its ETag; each encoding
+        gets its own strong ETag.
+        """
+        if self.br is not None and accepts_encoding(accept_encoding, "br"):
+            return self.br, "br", f'{self.etag[:-1]}-br"'
+        if accepts_encoding(accept_encoding, "gzip"):
+            return self.gzip, "gzip", f'{self.etag[:-1]}-gzip"'
+        return self.body, None, self.etag
+
+
+def build_asset(name: str, body: str | bytes, content_type: str) -> StaticAsset:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return StaticAsset(
+        name=name,
+        content_type=content_type,
+        body=body,
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        br=(
+            brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+            if brotli
+            else None
+        ),
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    )
+
+
+def find_plotly_js() -> str | None:
+    """Locate a local Plotly bundle.
+
+    ``BEES_PLOTLY_JS`` takes precedence, otherwise the bundle shipped with the
+    ``plotly`` Python package is used.
+    """
+    path = os.environ.get(PLOTLY_JS_ENV)
+    if path:
+        return path
+    spec = importlib.util.find_spec("plotly")
+    if spec is None or spec.origin is None:
+        return None
+    path = os.path.join(os.path.dirname(spec.origin), "package_data", "plotly.min.js")
+    return path if os.path.exists(path) else None
+
+
+def build_assets(
+    plots: list[dict], chart_script: str
+) -> dict[str, StaticAsset]:
+    assets = [
+        build_asset(
+            "plots.js",
+            f"var PLOTS = {json.dumps(plots, separators=(',', ':'))};",
+            "application/javascript",
+        ),
+        build_asset("chart.js", chart_script, "application/javascript"),
+    ]
+    plotly_js = find_plotly_js()
+    if plotly_js is not None:
+        with open(plotly_js, "rb") as f:
+            assets.append(
+                build_asset("plotly.min.js", f.read(), "application/javascript")
+            )
+    return {asset.name: asset for asset in assets}
@@ -0,0 +1,137 @@
+"""Compact binary encoding of chart updates for the WebSocket channel.
+
+A frame is a concatenation of little-endian records:
+
+* ``TIME``: ``<Bi``, advance the current timestamp by a delta in centiseconds,
+* ``EXTEND``: ``<BBBf``, append ``y`` at the current timestamp to a trace,
+* ``REPLACE``: ``<BBBI`` + compact JSON, replace a trace's data (tables),
+* ``UPDATE``: ``<BI`` + compact JSON, any other update in its SSE form,
+* ``CLOSE``: ``<B``, the stream has ended.
+
+Plots are addressed by their index in ``PLOTS_RESULT``. A ``REPLACE`` record
+identical to the last one sent for the same trace is skipped.
+"""
+import json
+import math
+import struct
+
+KIND_TIME = 0
+KIND_EXTEND = 1
+KIND_REPLACE = 2
+KIND_UPDATE = 3
+KIND_CLOSE = 4
+
+_TIME = struct.Struct("<Bi")
+_EXTEND = struct.Struct("<BBBf")
+_REPLACE = struct.Struct("<BBBI")
+_UPDATE = struct.Struct("<BI")
+_CLOSE = struct.Struct("<B")
+
+
+def _compact_json(data) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _is_scalar_extend(update: dict) -> bool:
+    data = update["data"]
+    return (
+        update["operation"] == "extend"
+        and isinstance(data, dict)
+        and len(data["x"]) == 1
+        and len(data["x"][0]) == 1
+        and len(data["y"]) == 1
+        and len(data["y"][0]) == 1
+    )
+
+
+class FrameEncoder:
+    """Stateful encoder for one subscriber; timestamps are delta-encoded."""
+
+    def __init__(self, plots: list[dict]):
+        self.plot_index = {plot["name"]: i for i, plot in enumerate(plots)}
+        self._time = 0
+        self._tables: dict[tuple[int, int], bytes] = {}
+
+    def encode(self, updates: list[dict | None]) -> bytes:
+        out = bytearray()
+        for update in updates:
+            if update is None:
+                out += _CLOSE.pack(KIND_CLOSE)
+                continue
+            plot = self.plot_index.get(update["plot"])
+            trace = update["trace"]
+            if plot is None:
+                payload = _compact_json(update)
+                out += _UPDATE.pack(KIND_UPDATE, len(payload)) + payload
+            elif _is_scalar_extend(update):
+                now = round(update["data"]["x"][0][0] * 100)
+                if now != self._time:
+                    out += _TIME.pack(KIND_TIME, now - self._time)
+                    self._time = now
+                y = update["data"]["y"][0][0]
+                out += _EXTEND.pack(
+                    KIND_EXTEND, plot, trace, math.nan if y is None else y
+                )
+            elif update["operation"] == "replace":
+                payload = _compact_json(update["data"])
+                if self._tables.get((plot, trace)) == payload:
+                    continue
+                self._tables[(plot, trace)] = payload
+                out += _REPLACE.pack(KIND_REPLACE, plot, trace, len(payload))
+                out += payload
+            else:
+                payload = _compact_json(update)
+                out += _UPDATE.pack(KIND_UPDATE, len(payload)) + payload
+        return bytes(out)
+
+
+class FrameDecoder:
+    """Python counterpart of the decoder in ``SCRIPT_CHART``."""
+
+    def __init__(self, plots: list[dict]):
+        self.plot_names = [plot["name"] for plot in plots]
+        self._time = 0
+
+    def decode(self, frame: bytes) -> list[dict | None]:
+        updates = []
+        offset = 0
+        while offset < len(frame):
+            kind = frame[offset]
+            if kind == KIND_TIME:
+                _, delta = _TIME.unpack_from(frame, offset)
+                self._time += delta
+                offset += _TIME.size
+            elif kind == KIND_EXTEND:
+                _, plot, trace, y = _EXTEND.unpack_from(frame, offset)
+                updates.append(
+                    {
+                        "plot": self.plot_names[plot],
+                        "data": {"x": [[self._time / 100]], "y": [[y]]},
+                        "trace": trace,
+                        "operation": "extend",
+                    }
+                )
+                offset += _EXTEND.size
+            elif kind == KIND_REPLACE:
+                _, plot, trace, length = _REPLACE.unpack_from(frame, offset)
+                offset += _REPLACE.size
+                updates.append(
+                    {
+                        "plot": self.plot_names[plot],
+                        "data": json.loads(frame[offset : offset + length]),
+                        "trace": trace,
+                        "operation": "replace",
+                    }
+                )
+                offset += length
+            elif kind == KIND_UPDATE:
+                _, length = _UPDATE.unpack_from(frame, offset)
+                offset += _UPDATE.size
+                updates.append(json.loads(frame[offset : offset + length]))
+                offset += length
+            elif kind == KIND_CLOSE:
+                updates.append(None)
+                offset += _CLOSE.size
+            else:
+                raise ValueError(f"Unknown record kind: {kind}")
+        return updates
@@ -0,0 +1,537 @@
+"""Self-benchmark for the Bees engine.
+
+Drives ``bees._run_benchmark`` against a local mock target (see
+``benchmarks.mock_target``) and measures how fast Bees itself is:
+
+* ``max_rps``: the highest steady-state throughput (after the cold start, as
+  reported by the collector) while doubling users from ``--users`` until
+  throughput stops growing by ``--plateau`` or ``--max-users`` is reached,
+* ``cpu_ms_per_request``: generator process CPU time per completed request
+  in the run that reached ``max_rps``,
+* ``memory_mb_per_hour``: RSS growth over that run, extrapolated to an hour,
+* ``collector_ms_per_tick``: CPU cost of one ``_data_collector_loop`` tick,
+* ``sse_us_per_event_per_subscriber``: CPU cost of live ``_stream_chart_data``
+  fan-out per event and subscriber, with subscribers woken by each collector
+  tick,
+* ``sse_bytes_per_tick`` / ``ws_bytes_per_tick``: bytes one collector tick
+  costs on the SSE stream and on the binary WebSocket channel; the frames are
+  decoded again to check the encoding is lossless.
+
+Before measuring, every entry in ``REQUEST_OPTION_CHECKS`` is sent to the
+target's ``/echo`` endpoint to check the parsed curl options reach the wire
+as curl would send them.
+
+Results are written as JSON and can be checked against an earlier run::
+
+    python -m benchmarks.bench_bees --output benchmarks/baseline.json
+    python -m benchmarks.bench_bees --compare benchmarks/baseline.json
+
+Run it from the repository root. Longer ``--duration`` values give steadier
+memory numbers.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+
+import aiohttp
+import psutil
+
+import bees
+import curlparser
+from bees.codec import FrameDecoder
+from benchmarks.mock_target import (MockTargetConfig, start_in_process,
+                                    start_subprocess)
+
+BASELINE_VERSION = 1
+
+# whether a higher or lower value is better, used by --compare
+METRIC_DIRECTIONS = {
+    "max_rps": "higher",
+    "cpu_ms_per_request": "lower",
+    "memory_mb_per_hour": "lower",
+    "collector_ms_per_tick": "lower",
+    "sse_us_per_event_per_subscriber": "lower",
+    "ws_bytes_per_tick": "lower",
+}
+
+
+# curl arguments, path on the mock target and a check of what it received
+REQUEST_OPTION_CHECKS = [
+    (
+        "-F f=v -F g=w",
+        "/echo",
+        lambda r: r["headers"]["content-type"].startswith("multipart/form-data")
+        and 'name="f"' in r["body"]
+        and 'name="g"' in r["body"],
+    ),
+    (
+        """--json '{"a": 1}'""",
+        "/echo",
+        lambda r: r["method"] == "POST"
+        and r["headers"]["content-type"] == "application/json"
+        and r["body"] == '{"a": 1}',
+    ),
+    (
+        "-d a=1 -X PUT",
+        "/echo",
+        lambda r: r["method"] == "PUT"
+        and r["headers"]["content-type"] == "application/x-www-form-urlencoded"
+        and r["body"] == "a=1",
+    ),
+    (
+        "-G -d q=1 --data-urlencode 'n=a b'",
+        "/echo",
+        lambda r: r["method"] == "GET" and r["path_qs"] == "/echo?q=1&n=a%20b",
+    ),
+    ("", "/echo", lambda r: "accept-encoding" not in r["headers"]),
+    ("--compressed", "/echo", lambda r: "gzip" in r["headers"]["accept-encoding"]),
+    (
+        "-u me:pw -A ua -e ref -b 'a=1; b=2'",
+        "/echo",
+        lambda r: r["headers"]["authorization"] == "Basic bWU6cHc="
+        and r["headers"]["user-agent"] == "ua"
+        and r["headers"]["referer"] == "ref"
+        and sorted(r["headers"]["cookie"].split("; ")) == ["a=1", "b=2"],
+    ),
+    ("", "/redirect", lambda r: r["status"] == 302),
+    ("-L", "/redirect", lambda r: r["status"] == 200 and r["path_qs"] == "/echo"),
+]
+
+
+async def check_request_options(base_url: str) -> int:
+    """Send each parsed curl command the way ``_user_loop`` does and check
+    what the target received. Returns the number of checks run."""
+    for args, path, check in REQUEST_OPTION_CHECKS:
+        info = curlparser.parse(f"curl {args} {base_url}{path}")
+        async with aiohttp.ClientSession(
+            cookie_jar=aiohttp.DummyCookieJar(),
+            **bees._session_options(info, 10),
+        ) as session:
+            async with session.request(**bees._request_options(info)) as response:
+                received = {"status": response.status}
+                if response.content_type == "application/json":
+                    received.update(await response.json())
+                    received["headers"] = {
+                        k.lower(): v for k, v in received["headers"].items()
+                    }
+        try:
+            ok = check(received)
+        except KeyError:
+            ok = False
+        if not ok:
+            raise RuntimeError(f"curl {args} {path}: target received {received}")
+    return len(REQUEST_OPTION_CHECKS)
+
+
+def _throughput_samples(result_id: str, since: float) -> list[float]:
+    return [
+        data["data"]["y"][0][0]
+        for data in bees.DATAS[result_id]
+        if data is not None
+        and data["plot"] == "throughput"
+        and data["trace"] == 0
+        and data["data"]["x"][0][0] >= since
+    ]
+
+
+async def measure_engine(
+    url: str, users: int, duration: int, interval: int
+) -> dict:
+    result_id = f"bench-{uuid.uuid4()}"
+    proc = psutil.Process(os.getpid())
+    gc.collect()
+    rss_start = proc.memory_info().rss
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    try:
+        await bees._run_benchmark(
+            result_id,
+            f"curl {url}",
+            users,
+            duration,
+            collector_interval=interval,
+        )
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        gc.collect()
+        rss_end = proc.memory_info().rss
+
+        registry = bees.METRICS[result_id]
+        total = registry.counter("request.total").get_count()
+        errors = registry.counter("request.error").get_count()
+        cold_start = min(duration / 3, bees.MAX_COLD_START_TIME)
+        samples = _throughput_samples(result_id, since=cold_start)
+        return {
+            "result_id": result_id,
+            "requests": total,
+            "error_ratio": errors / total if total else 0.0,
+            "steady_rps": sum(samples) / len(samples) if samples else 0.0,
+            "cpu_ms_per_request": cpu * 1000 / total if total else None,
+            "memory_mb_per_hour": (rss_end - rss_start) / 2**20 / wall * 3600,
+        }
+    except BaseException:
+        bees._clear_result(result_id)
+        raise
+
+
+async def measure_max_rps(
+    url: str,
+    users: int,
+    max_users: int,
+    plateau: float,
+    duration: int,
+    interval: int,
+) -> tuple[dict, list[dict]]:
+    """Double users until throughput plateaus and return the peak run."""
+    steps = []
+    best = None
+    while True:
+        result = await measure_engine(url, users, duration, interval)
+        rps = result["steady_rps"]
+        steps.append({"users": users, "steady_rps": rps})
+        growing = best is None or rps > best["steady_rps"] * (1 + plateau)
+        if best is None or rps > best["steady_rps"]:
+            if best is not None:
+                bees._clear_result(best["result_id"])
+            best = {**result, "users": users}
+        else:
+            bees._clear_result(result["result_id"])
+        if not growing or users >= max_users:
+            return best, steps
+        users = min(users * 2, max_users)
+
+
+async def _live_collector_run(
+    subscribers: int, ticks: int, seed: int
+) -> tuple[float, int, int, int]:
+    """Run the collector on fed data with live SSE subscribers attached.
+
+    Returns the CPU seconds used, collector ticks, events delivered and bytes
+    delivered.
+    """
+    result_id = f"bench-fanout-{uuid.uuid4()}"
+    rng = random.Random(seed)
+    recorder = bees.RECORDERS[result_id]
+    bees.NOTI_RUNNING[result_id].set()
+
+    async def drain() -> tuple[int, int]:
+        events = 0
+        size = 0
+        async for chunk in bees._stream_chart_data(result_id):
+            events += 1
+            size += len(chunk)
+        return events, size
+
+    interval = 0.01
+    try:
+        cpu_start = time.process_time()
+        drains = [asyncio.create_task(drain()) for _ in range(subscribers)]
+        collector = asyncio.create_task(
+            bees._data_collector_loop(result_id, interval)
+        )
+        for _ in range(ticks):
+            for _ in range(100):
+                recorder.buffer.add_response(rng.random())
+            await asyncio.sleep(interval)
+        bees.NOTI_STOPPING[result_id].set()
+        await collector
+        drained = await asyncio.gather(*drains)
+        cpu = time.process_time() - cpu_start
+        done = sum(
+            1
+            for data in bees.DATAS[result_id]
+            if data is not None and data["plot"] == "system"
+        )
+        return (
+            cpu,
+            done,
+            sum(e for e, _ in drained),
+            sum(s for _, s in drained),
+        )
+    finally:
+        bees._clear_result(result_id)
+
+
+async def measure_sse_fanout(
+    subscribers_list: list[int], ticks: int, seed: int
+) -> list[dict]:
+    """Measure the live fan-out cost of ``_stream_chart_data``.
+
+    Subscribers are attached while the collector produces ticks, so every
+    ``NOTI_HAS_DATA`` wake-up is included. The CPU of a run without
+    subscribers is subtracted, scaled by the number of ticks.
+    """
+    base_cpu, base_ticks, _, _ = await _live_collector_run(0, ticks, seed)
+    base_per_tick = base_cpu / base_ticks if base_ticks else 0.0
+    results = []
+    for subscribers in subscribers_list:
+        cpu, done, events, size = await _live_collector_run(
+            subscribers, ticks, seed
+        )
+        fanout_cpu = max(cpu - base_per_tick * done, 0.0)
+        results.append(
+            {
+                "subscribers": subscribers,
+                "us_per_event_per_subscriber": (
+                    fanout_cpu * 1e6 / events if events else None
+                ),
+                "bytes_per_event": size / events if events else None,
+            }
+        )
+    return results
+
+
+def _check_round_trip(sent: list, decoded: list) -> None:
+    """Check the WebSocket frames carry the same chart data as the SSE stream.
+
+    Scalar points must match to float32 precision and tables must match once
+    the unchanged replacements the encoder skips are dropped.
+    """
+    expected = []
+    last_tables = {}
+    for update in sent:
+        if update is not None and update["operation"] == "replace":
+            key = (update["plot"], update["trace"])
+            if last_tables.get(key) == update["data"]:
+                continue
+            last_tables[key] = update["data"]
+        expected.append(update)
+    if len(expected) != len(decoded):
+        raise RuntimeError(
+            f"WebSocket stream has {len(decoded)} updates, expected {len(expected)}"
+        )
+    for want, got in zip(expected, decoded):
+        if want is None or got is None or want["operation"] != "extend":
+            ok = want == got
+        else:
+            want_y = want["data"]["y"][0][0]
+            got_y = got["data"]["y"][0][0]
+            ok = (
+                want["plot"] == got["plot"]
+                and want["trace"] == got["trace"]
+                and math.isclose(want["data"]["x"][0][0], got["data"]["x"][0][0])
+                and (
+                    math.isclose(want_y, got_y, rel_tol=1e-6, abs_tol=1e-9)
+                    if want_y is not None
+                    else math.isnan(got_y)
+                )
+            )
+        if not ok:
+            raise RuntimeError(f"WebSocket encoding is lossy: {want} != {got}")
+
+
+async def measure_stream_bytes(result_id: str) -> dict:
+    ticks = sum(
+        1
+        for data in bees.DATAS[result_id]
+        if data is not None and data["plot"] == "system"
+    )
+    sse = 0
+    async for chunk in bees._stream_chart_data(result_id):
+        sse += len(chunk)
+    ws = 0
+    decoder = FrameDecoder(bees.PLOTS_RESULT)
+    decoded = []
+    async for frame in bees._stream_chart_frames(result_id):
+        ws += len(frame)
+        decoded.extend(decoder.decode(frame))
+    _check_round_trip(bees.DATAS[result_id], decoded)
+    return {
+        "sse_bytes_per_tick": sse / ticks if ticks else None,
+        "ws_bytes_per_tick": ws / ticks if ticks else None,
+    }
+
+
+async def measure_collector(
+    ticks: int, samples: int, error_kinds: int, seed: int
+) -> float:
+    result_id = f"bench-collector-{uuid.uuid4()}"
+    rng = random.Random(seed)
+    buffer = bees.RECORDERS[result_id].buffer
+    for _ in range(samples):
+        buffer.add_response(rng.random())
+    for i in range(error_kinds):
+        for _ in range(i + 1):
+            buffer.add_error(f"500.mock error {i}")
+    bees.NOTI_RUNNING[result_id].set()
+
+    interval = 0.01
+    try:
+        cpu_start = time.process_time()
+        task = asyncio.create_task(bees._data_collector_loop(result_id, interval))
+        await asyncio.sleep(ticks * interval)
+        bees.NOTI_STOPPING[result_id].set()
+        await task
+        cpu = time.process_time() - cpu_start
+        done = sum(
+            1
+            for data in bees.DATAS[result_id]
+            if data is not None and data["plot"] == "system"
+        )
+        return cpu * 1000 / done if done else 0.0
+    finally:
+        bees._clear_result(result_id)
+
+
+async def run(args) -> dict:
+    config = MockTargetConfig(
+        latency=args.latency,
+        body_size=args.body_size,
+        error_rate=args.error_rate,
+        stream_chunks=args.stream_chunks,
+        stream_interval=args.stream_interval,
+        seed=args.seed,
+    )
+    if args.in_process:
+        target, port = await start_in_process(config)
+    else:
+        target, port = await start_subprocess(config)
+
+    try:
+        option_checks = await check_request_options(f"http://127.0.0.1:{port}")
+        engine, steps = await measure_max_rps(
+            f"http://127.0.0.1:{port}/",
+            args.users,
+            args.max_users,
+            args.plateau,
+            args.duration,
+            args.interval,
+        )
+    finally:
+        if args.in_process:
+            await target.cleanup()
+        else:
+            target.terminate()
+            await target.wait()
+
+    result_id = engine.pop("result_id")
+    engine["max_rps"] = engine.pop("steady_rps")
+    engine["max_rps_users"] = engine.pop("users")
+    engine["rps_steps"] = steps
+    try:
+        stream_bytes = await measure_stream_bytes(result_id)
+    finally:
+        bees._clear_result(result_id)
+    fanout = await measure_sse_fanout(
+        args.subscribers, args.collector_ticks, seed=args.seed
+    )
+    collector_ms = await measure_collector(
+        args.collector_ticks, samples=10_000, error_kinds=50, seed=args.seed
+    )
+
+    return {
+        "version": BASELINE_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "users": args.users,
+            "max_users": args.max_users,
+            "plateau": args.plateau,
+            "duration": args.duration,
+            "interval": args.interval,
+            "target": {**config.__dict__, "in_process": args.in_process},
+        },
+        "results": {
+            **engine,
+            "request_option_checks": option_checks,
+            "collector_ms_per_tick": collector_ms,
+            "sse_us_per_event_per_subscriber": fanout[-1][
+                "us_per_event_per_subscriber"
+            ],
+            "sse_fanout": fanout,
+            **stream_bytes,
+        },
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison table and return the names of regressed metrics."""
+    regressions = []
+    print(f"{'metric':<34}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, direction in METRIC_DIRECTIONS.items():
+        old = baseline["results"].get(name)
+        new = current["results"].get(name)
+        if old is None or new is None:
+            continue
+        change = (new - old) / abs(old) if old else 0.0
+        worse = -change if direction == "higher" else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<34}{old:>14.4f}{new:>14.4f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--users", type=int, default=50, help="users in the first step"
+    )
+    parser.add_argument("--max-users", type=int, default=800)
+    parser.add_argument(
+        "--plateau",
+        type=float,
+        default=0.05,
+        help="minimum relative throughput gain to keep doubling users",
+    )
+    parser.add_argument("--duration", type=int, default=20)
+    parser.add_argument("--interval", type=int, default=1)
+    parser.add_argument("--latency", default="fixed:0")
+    parser.add_argument("--body-size", type=int, default=256)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-chunks", type=int, default=0)
+    parser.add_argument("--stream-interval", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run the mock target in the benchmark's event loop",
+    )
+    parser.add_argument(
+        "--subscribers",
+        type=lambda s: [int(n) for n in s.split(",")],
+        default=[1, 10, 100],
+        help="comma separated SSE subscriber counts",
+    )
+    parser.add_argument("--collector-ticks", type=int, default=200)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed relative regression before failing --compare",
+    )
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Parse-throughput benchmark for ``curlparser``.
+
+Reads JSONL corpora where each line is either a JSON string or an object
+holding the command under ``code``, ``command`` or ``curl``, and reports
+tokenizer, cold (uncached) and cached parse throughput::
+
+    python -m benchmarks.bench_curlparser corpus.jsonl [more.jsonl ...]
+
+Without a corpus, a synthetic set of playground-style commands is used.
+"""
+import argparse
+import collections
+import json
+import random
+import sys
+import time
+
+import curlparser
+from curlparser.parser import _parse, tokenize
+
+COMMAND_KEYS = ("code", "command", "curl")
+
+
+def load_corpus(paths: list[str]) -> list[str]:
+    commands = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, str):
+                    commands.append(record)
+                    continue
+                for key in COMMAND_KEYS:
+                    if key in record:
+                        commands.append(record[key])
+                        break
+    return commands
+
+
+def synthetic_corpus(size: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    commands = []
+    for i in range(size):
+        body = json.dumps(
+            {
+                "text": " ".join(
+                    rng.choice(["bento", "bees", "curl", "load", "test"])
+                    for _ in range(rng.randint(5, 200))
+                ),
+                "id": i,
+            },
+            indent=2,
+        )
+        flags = rng.sample(
+            ["-s", "-L", "--compressed", "-k", "--http2", "-m 30"], k=rng.randint(0, 3)
+        )
+        commands.append(
+            f"curl -X 'POST' \\\n  'http://localhost:3000/api/{i}' \\\n"
+            f"  -H 'accept: application/json' \\\n"
+            f"  -H 'Content-Type: application/json' \\\n"
+            f"  {' '.join(flags)} -d '{body}'"
+        )
+    return commands
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def run(commands: list[str], repeat: int) -> dict:
+    size = sum(len(c) for c in commands)
+
+    start = time.perf_counter()
+    for command in commands:
+        try:
+            tokenize(command)
+        except curlparser.CurlParseError:
+            pass
+    tokenize_seconds = time.perf_counter() - start
+
+    errors = collections.Counter()
+    _parse.cache_clear()
+    start = time.perf_counter()
+    for command in commands:
+        try:
+            curlparser.parse(command)
+        except curlparser.CurlParseError as e:
+            errors[str(e)] += 1
+    cold_seconds = time.perf_counter() - start
+
+    # only the most recent commands fit in the cache, so replay those
+    cached = commands[-_parse.cache_info().maxsize :]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for command in cached:
+            try:
+                curlparser.parse(command)
+            except curlparser.CurlParseError:
+                pass
+    cached_seconds = time.perf_counter() - start
+
+    return {
+        "commands": len(commands),
+        "megabytes": size / 2**20,
+        "tokenize_per_second": _rate(len(commands), tokenize_seconds),
+        "cold_parse_per_second": _rate(len(commands), cold_seconds),
+        "cold_parse_mb_per_second": _rate(size / 2**20, cold_seconds),
+        "cached_parse_per_second": _rate(len(cached) * repeat, cached_seconds),
+        "errors": dict(errors.most_common()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="*", help="JSONL files with curl commands")
+    parser.add_argument("--synthetic", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.corpus:
+        commands = load_corpus(args.corpus)
+    else:
+        commands = synthetic_corpus(args.synthetic, args.seed)
+    result = run(commands, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""A local HTTP target for benchmarking Bees itself.
+
+The target answers every request after a latency drawn from a configurable
+distribution, with a body of a fixed size, an optional error rate and an
+optional chunked (streaming) response; ``/echo`` and ``/redirect`` are
+reserved for checking request options. It can run inside the caller's event
+loop or as a subprocess, which keeps its CPU out of the generator's numbers::
+
+    python -m benchmarks.mock_target --latency exp:0.01 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import random
+import sys
+from dataclasses import dataclass
+
+from aiohttp import web
+
+
+def parse_latency(spec: str):
+    """Build a sampler from ``fixed:S``, ``uniform:LO,HI``, ``exp:MEAN`` or
+    ``lognormal:MU,SIGMA`` (all in seconds)."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        (seconds,) = values or [0.0]
+        return lambda rng: seconds
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "exp":
+        (mean,) = values
+        return lambda rng: rng.expovariate(1 / mean) if mean > 0 else 0.0
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@dataclass
+class MockTargetConfig:
+    latency: str = "fixed:0"
+    body_size: int = 256
+    error_rate: float = 0.0
+    stream_chunks: int = 0
+    stream_interval: float = 0.0
+    seed: int = 0
+
+
+def make_app(config: MockTargetConfig) -> web.Application:
+    rng = random.Random(config.seed)
+    sample_latency = parse_latency(config.latency)
+    body = b"x" * config.body_size
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        await request.read()
+        delay = sample_latency(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < config.error_rate:
+            return web.Response(status=500, body=b"mock error")
+        if config.stream_chunks <= 0:
+            return web.Response(body=body)
+
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        chunk_size = max(len(body) // config.stream_chunks, 1)
+        for start in range(0, len(body), chunk_size):
+            await response.write(body[start : start + chunk_size])
+            if config.stream_interval > 0:
+                await asyncio.sleep(config.stream_interval)
+        await response.write_eof()
+        return response
+
+    async def echo(request: web.Request) -> web.Response:
+        """Describe the request as received, to check what Bees sends."""
+        body = await request.read()
+        return web.json_response(
+            {
+                "method": request.method,
+                "path_qs": request.path_qs,
+                "headers": dict(request.headers),
+                "body": body.decode("utf-8", errors="replace"),
+            }
+        )
+
+    async def redirect(request: web.Request) -> web.Response:
+        raise web.HTTPFound("/echo")
+
+    app = web.Application()
+    app.router.add_route("*", "/echo", echo)
+    app.router.add_route("*", "/redirect", redirect)
+    app.router.add_route("*", "/{tail:.*}", handle)
+    return app
+
+
+async def start_in_process(
+    config: MockTargetConfig, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, int]:
+    runner = web.AppRunner(make_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+async def start_subprocess(
+    config: MockTargetConfig, host: str = "127.0.0.1"
+) -> tuple[asyncio.subprocess.Process, int]:
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.mock_target",
+        "--host",
+        host,
+        "--latency",
+        config.latency,
+        "--body-size",
+        str(config.body_size),
+        "--error-rate",
+        str(config.error_rate),
+        "--stream-chunks",
+        str(config.stream_chunks),
+        "--stream-interval",
+        str(config.stream_interval),
+        "--seed",
+        str(config.seed),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = await proc.stdout.readline()
+    if not line.startswith(b"READY "):
+        proc.kill()
+        raise RuntimeError("Mock target failed to start")
+    return proc, int(line.split()[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", default=MockTargetConfig.latency)
+    parser.add_argument("--body-size", type=int, default=MockTargetConfig.body_size)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-chunks", type=int, default=0)
+    parser.add_argument("--stream-interval", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    config = MockTargetConfig(
+        latency=args.latency,
+        body_size=args.body_size,
+        error_rate=args.error_rate,
+        stream_chunks=args.stream_chunks,
+        stream_interval=args.stream_interval,
+        seed=args.seed,
+    )
+
+    async def serve():
+        runner, port = await start_in_process(config, args.host, args.port)
+        print(f"READY {port}", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
 from __future__ import absolute_import
 
 from .__version__ import __version__
-from .parser import parse
+from .parser import CurlParseError, parse
@@ -1,8 +1,8 @@
-import argparse
+import functools
 import json
-import shlex
+import types
 from collections import OrderedDict, namedtuple
-from urllib.parse import urlparse
+from urllib.parse import quote, urlparse
 
 ParsedCommand = namedtuple(
     "ParsedCommand",
@@ -16,25 +16,122 @@ ParsedCommand = namedtuple(
         "headers",
         "verify",
         "max_time",
+        "connect_timeout",
+        "form",
+        "allow_redirects",
+        "max_redirects",
+        "compressed",
+        "http_version",
+        "proxy",
     ],
+    defaults=(None, (), False, 50, False, None, None),
 )
 
-parser = argparse.ArgumentParser()
+PARSE_CACHE_SIZE = 1024
 
-parser.add_argument("command")
-parser.add_argument("url")
-parser.add_argument("-A", "--user-agent")
-parser.add_argument("-I", "--head")
-parser.add_argument("-H", "--header", action="append", default=[])
-parser.add_argument("-b", "--cookie", action="append", default=[])
-parser.add_argument(
-    "-d", "--data", "--data-ascii", "--data-binary", "--data-raw", default=None
-)
-parser.add_argument("-k", "--insecure", action="store_false")
-parser.add_argument("-u", "--user", default=())
-parser.add_argument("-X", "--request", default="")
-parser.add_argument("-m", "--max-time", default=None)
-parser.add_argument("-s", "--silent", action="store_true")
+
+class CurlParseError(ValueError):
+    pass
+
+
+# options taking an argument, mapped to the name they are collected under
+ARG_OPTIONS = {
+    "-X": "request",
+    "--request": "request",
+    "-H": "header",
+    "--header": "header",
+    "-b": "cookie",
+    "--cookie": "cookie",
+    "-d": "data",
+    "--data": "data",
+    "--data-ascii": "data",
+    "--data-binary": "data",
+    "--data-raw": "data_raw",
+    "--data-urlencode": "data_urlencode",
+    "--json": "json",
+    "-F": "form",
+    "--form": "form",
+    "--form-string": "form_string",
+    "-u": "user",
+    "--user": "user",
+    "-A": "user_agent",
+    "--user-agent": "user_agent",
+    "-e": "referer",
+    "--referer": "referer",
+    "-m": "max_time",
+    "--max-time": "max_time",
+    "--connect-timeout": "connect_timeout",
+    "--max-redirs": "max_redirs",
+    "-x": "proxy",
+    "--proxy": "proxy",
+    "--url": "url",
+    # accepted and ignored, they do not change the request
+    "-o": None,
+    "--output": None,
+    "-w": None,
+    "--write-out": None,
+    "-c": None,
+    "--cookie-jar": None,
+    "--retry": None,
+    "--retry-delay": None,
+    "--retry-max-time": None,
+    "--cacert": None,
+    "--capath": None,
+}
+
+# options without an argument
+FLAG_OPTIONS = {
+    "-k": "insecure",
+    "--insecure": "insecure",
+    "-L": "location",
+    "--location": "location",
+    "--compressed": "compressed",
+    "-G": "get",
+    "--get": "get",
+    "-I": "head",
+    "--head": "head",
+    "-0": "http1.0",
+    "--http1.0": "http1.0",
+    "--http1.1": "http1.1",
+    "--http2": "http2",
+    "--http2-prior-knowledge": "http2",
+    "--http3": "http3",
+    # accepted and ignored, they do not change the request
+    "-s": None,
+    "--silent": None,
+    "-S": None,
+    "--show-error": None,
+    "-v": None,
+    "--verbose": None,
+    "-i": None,
+    "--include": None,
+    "-f": None,
+    "--fail": None,
+    "-N": None,
+    "--no-buffer": None,
+    "-g": None,
+    "--globoff": None,
+    "-#": None,
+    "--progress-bar": None,
+}
+
+HTTP_VERSIONS = {"http1.0": "1.0", "http1.1": "1.1", "http2": "2", "http3": "3"}
+
+_ANSI_C_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "e": "\x1b",
+    "E": "\x1b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+    "\\": "\\",
+    "'": "'",
+    '"': '"',
+    "?": "?",
+}
 
 
 def is_url(url: str) -> bool:
@@ -45,66 +142,333 @@ def is_url(url: str) -> bool:
         return False
 
 
+def tokenize(command: str) -> list[str]:
+    """Split a shell command line the way a POSIX shell would.
+
+    Supports single, double and ANSI-C (``$'...'``) quoting, backslash
+    escapes and line continuations, which covers commands copied from
+    browsers and the BentoML playground.
+    """
+    tokens = []
+    current = []
+    in_token = False
+    i = 0
+    n = len(command)
+    while i < n:
+        c = command[i]
+        if c in " \t\r\n":
+            if in_token:
+                tokens.append("".join(current))
+                current = []
+                in_token = False
+            i += 1
+        elif c == "\\":
+            if command.startswith("\n", i + 1):  # line continuation
+                i += 2
+            elif command.startswith("\r\n", i + 1):
+                i += 3
+            else:
+                current.append(command[i + 1 : i + 2])
+                in_token = True
+                i += 2
+        elif c == "'":
+            end = command.find("'", i + 1)
+            if end < 0:
+                raise CurlParseError("Unterminated single quote in cURL command")
+            current.append(command[i + 1 : end])
+            in_token = True
+            i = end + 1
+        elif c == '"':
+            i += 1
+            while True:
+                if i >= n:
+                    raise CurlParseError("Unterminated double quote in cURL command")
+                c = command[i]
+                if c == '"':
+                    break
+                if c == "\\" and i + 1 < n and command[i + 1] in '\\"$`\n':
+                    if command[i + 1] != "\n":
+                        current.append(command[i + 1])
+                    i += 2
+                else:
+                    current.append(c)
+                    i += 1
+            in_token = True
+            i += 1
+        elif c == "$" and command.startswith("$'", i):
+            i += 2
+            while True:
+                if i >= n:
+                    raise CurlParseError("Unterminated $'...' quote in cURL command")
+                c = command[i]
+                if c == "'":
+                    break
+                if c == "\\" and i + 1 < n:
+                    escaped = command[i + 1]
+                    if escaped in "xu":
+                        width = 2 if escaped == "x" else 4
+                        digits = command[i + 2 : i + 2 + width]
+                        try:
+                            current.append(chr(int(digits, 16)))
+                        except ValueError:
+                            raise CurlParseError(
+                                f"Invalid escape in cURL command: \\{escaped}{digits}"
+                            )
+                        i += 2 + width
+                    else:
+                        current.append(_ANSI_C_ESCAPES.get(escaped, "\\" + escaped))
+                        i += 2
+                else:
+                    current.append(c)
+                    i += 1
+            in_token = True
+            i += 1
+        else:
+            current.append(c)
+            in_token = True
+            i += 1
+    if in_token:
+        tokens.append("".join(current))
+    return tokens
+
+
+def _iter_options(tokens: list[str]):
+    """Yield ``(name, value)`` for options and ``(None, value)`` for positionals.
+
+    Flags yield a ``None`` value; options that do not affect the request are
+    consumed without being yielded.
+    """
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+        if token == "--":
+            for positional in tokens[i:]:
+                yield None, positional
+            return
+        if token.startswith("--"):
+            if token in FLAG_OPTIONS:
+                if FLAG_OPTIONS[token] is not None:
+                    yield FLAG_OPTIONS[token], None
+                continue
+            if token not in ARG_OPTIONS:
+                raise CurlParseError(f"Unsupported cURL option: {token}")
+            if i >= len(tokens):
+                raise CurlParseError(f"cURL option {token} requires a value")
+            if ARG_OPTIONS[token] is not None:
+                yield ARG_OPTIONS[token], tokens[i]
+            i += 1
+        elif token.startswith("-") and len(token) > 1:
+            # short options can be combined (-sSL) and take attached values (-XPOST)
+            j = 1
+            while j < len(token):
+                option = "-" + token[j]
+                j += 1
+                if option in FLAG_OPTIONS:
+                    if FLAG_OPTIONS[option] is not None:
+                        yield FLAG_OPTIONS[option], None
+                    continue
+                if option not in ARG_OPTIONS:
+                    raise CurlParseError(f"Unsupported cURL option: {option}")
+                if j < len(token):
+                    value = token[j:]
+                elif i < len(tokens):
+                    value = tokens[i]
+                    i += 1
+                else:
+                    raise CurlParseError(f"cURL option {option} requires a value")
+                if ARG_OPTIONS[option] is not None:
+                    yield ARG_OPTIONS[option], value
+                break
+        else:
+            yield None, token
+
+
+def _urlencode_data(value: str) -> str:
+    # like curl, whichever of "@" and "=" comes first decides the form
+    at = value.find("@")
+    if at >= 0 and ("=" not in value or at < value.index("=")):
+        raise CurlParseError("Reading request data from files is not supported")
+    name, sep, content = value.partition("=")
+    if not sep:
+        return quote(value, safe="")
+    if not name:
+        return quote(content, safe="")
+    return f"{name}={quote(content, safe='')}"
+
+
+def _parse_form(value: str, literal: bool) -> tuple[str, str]:
+    name, sep, content = value.partition("=")
+    if not sep:
+        raise CurlParseError(f"Invalid form field: {value}")
+    if not literal and content[:1] in ("@", "<"):
+        raise CurlParseError("File uploads in form fields are not supported")
+    return name, content
+
+
+def _set_header(headers: OrderedDict, key: str, value: str) -> None:
+    for existing in list(headers):
+        if existing.lower() == key.lower():
+            del headers[existing]
+    headers[key] = value
+
+
+def _to_float(option: str, value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise CurlParseError(f"Invalid value for {option}: {value}")
+
+
 def parse(curl_command: str) -> ParsedCommand:
+    """Parse a cURL command line into request options.
+
+    Results are cached by command text and shared between callers, so treat
+    them as read-only; ``headers`` and ``cookies`` are read-only mappings.
+    Raises ``CurlParseError`` for commands that cannot be parsed.
+    """
+    return _parse(curl_command)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(curl_command: str) -> ParsedCommand:
     cookies = OrderedDict()
     headers = OrderedDict()
     body = None
     method = "GET"
 
-    curl_command = curl_command.replace("\\\n", " ")
-
-    tokens = shlex.split(curl_command)
-    parsed_args = parser.parse_args(tokens)
+    tokens = tokenize(curl_command)
+    if not tokens or tokens[0] != "curl":
+        raise CurlParseError("Not a valid cURL command")
 
-    if parsed_args.command != "curl":
-        raise ValueError("Not a valid cURL command")
+    positionals = []
+    data_parts = []
+    json_parts = []
+    form = []
+    user_headers = []
+    flags = set()
+    values = {}
+    for name, value in _iter_options(tokens[1:]):
+        if name is None or name == "url":
+            positionals.append(value)
+        elif value is None:
+            flags.add(name)
+        elif name == "header":
+            user_headers.append(value)
+        elif name == "cookie":
+            for pair in value.split(";"):
+                key, sep, cookie = pair.strip().partition("=")
+                if sep:
+                    cookies[key] = cookie
+        elif name == "data":
+            if value.startswith("@"):
+                raise CurlParseError("Reading request data from files is not supported")
+            data_parts.append(value)
+        elif name == "data_raw":
+            data_parts.append(value)
+        elif name == "data_urlencode":
+            data_parts.append(_urlencode_data(value))
+        elif name == "json":
+            if value.startswith("@"):
+                raise CurlParseError("Reading request data from files is not supported")
+            json_parts.append(value)
+        elif name == "form":
+            form.append(_parse_form(value, literal=False))
+        elif name == "form_string":
+            form.append(_parse_form(value, literal=True))
+        else:
+            values[name] = value
 
-    if not is_url(parsed_args.url):
-        raise ValueError("Not a valid URL for cURL command")
+    if not positionals:
+        raise CurlParseError("No URL in cURL command")
+    if len(positionals) > 1:
+        raise CurlParseError("Multiple URLs in cURL command are not supported")
+    url = positionals[0]
+    if "://" not in url:
+        url = "http://" + url
+    if not is_url(url):
+        raise CurlParseError("Not a valid URL for cURL command")
 
-    data = parsed_args.data
-    if data:
-        method = "POST"
+    if data_parts and json_parts:
+        raise CurlParseError("--json cannot be combined with --data")
+    if json_parts and "get" in flags:
+        raise CurlParseError("-G cannot be combined with --json")
+    if form and (data_parts or json_parts):
+        raise CurlParseError("--form cannot be combined with --data or --json")
 
-    if data:
+    data = None
+    if json_parts:
+        data = "".join(json_parts)
+        headers["Content-Type"] = "application/json"
+        headers["Accept"] = "application/json"
+    elif data_parts:
+        data = "&".join(data_parts)
+    if data is not None:
         try:
             body = json.loads(data)
         except json.JSONDecodeError:
-            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
         else:
             headers["Content-Type"] = "application/json"
 
-    if parsed_args.request:
-        method = parsed_args.request
+    if data is not None or form:
+        method = "POST"
+    if "get" in flags and data is not None:
+        separator = "&" if urlparse(url).query else "?"
+        url = f"{url}{separator}{data}"
+        data = None
+        body = None
+        headers.pop("Content-Type", None)
+        headers.pop("Accept", None)
+        method = "GET"
+    if "head" in flags:
+        method = "HEAD"
+    if values.get("request"):
+        method = values["request"]
 
-    for arg in parsed_args.cookie:
-        try:
-            key, value = arg.split("=", 1)
-        except ValueError:
-            pass
-        else:
-            cookies[key] = value
+    if "compressed" in flags:
+        headers["Accept-Encoding"] = "gzip, deflate"
+    if "user_agent" in values:
+        headers["User-Agent"] = values["user_agent"]
+    if "referer" in values:
+        headers["Referer"] = values["referer"]
+    for arg in user_headers:
+        key, sep, value = arg.partition(":")
+        if sep:
+            _set_header(headers, key.strip(), value.strip())
 
-    for arg in parsed_args.header:
-        try:
-            key, value = arg.split(":", 1)
-        except ValueError:
-            pass
-        else:
-            headers[key] = value
-
-    user = parsed_args.user
+    user = values.get("user", ())
     if user:
-        user = tuple(user.split(":"))
+        user = tuple(user.split(":", 1))
+
+    max_redirects = values.get("max_redirs", "50")
+    try:
+        max_redirects = int(max_redirects)
+    except ValueError:
+        raise CurlParseError(f"Invalid value for --max-redirs: {max_redirects}")
+
+    http_version = None
+    for flag, version in HTTP_VERSIONS.items():
+        if flag in flags:
+            http_version = version
 
     return ParsedCommand(
         method=method,
-        url=parsed_args.url,
+        url=url,
         auth=user,
-        cookies=cookies,
+        cookies=types.MappingProxyType(cookies),
         data=data,
         json=body,
-        headers=headers,
-        verify=parsed_args.insecure,
-        max_time=parsed_args.max_time,
+        headers=types.MappingProxyType(headers),
+        verify="insecure" not in flags,
+        max_time=_to_float("--max-time", values.get("max_time")),
+        connect_timeout=_to_float("--connect-timeout", values.get("connect_timeout")),
+        form=tuple(form),
+        allow_redirects="location" in flags,
+        max_redirects=max_redirects,
+        compressed="compressed" in flags,
+        http_version=http_version,
+        proxy=values.get("proxy"),
     )
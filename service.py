@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import math
 import uuid
 
@@ -6,9 +7,31 @@ import bentoml
 import jinja2
 import starlette.applications
 import starlette.responses
-
-from bees import (NOTI_RUNNING, NOTI_STOPPING, PLOTS_RESULT, TEMPLATE_INDEX,
-                  TEMPLATE_RESULT, _benchmark_controller, _stream_chart_data)
+import starlette.websockets
+
+import curlparser
+from bees import (PLOTS_RESULT, SCRIPT_CHART, TEMPLATE_INDEX, TEMPLATE_RESULT,
+                  _benchmark_controller, _control_benchmark, _gzip_stream,
+                  _stream_chart_data, _stream_chart_frames)
+from bees.assets import (PLOTLY_CDN_URL, StaticAsset, accepts_encoding,
+                         build_asset, build_assets)
+
+ASSETS = build_assets(PLOTS_RESULT, SCRIPT_CHART)
+PLOTLY_URL = (
+    ASSETS["plotly.min.js"].url if "plotly.min.js" in ASSETS else PLOTLY_CDN_URL
+)
+
+TEMPLATES = jinja2.Environment(
+    loader=jinja2.DictLoader(
+        {"index.html": TEMPLATE_INDEX, "result.html": TEMPLATE_RESULT}
+    ),
+    autoescape=True,
+)
+TEMPLATES.globals.update(assets=ASSETS, plotly_url=PLOTLY_URL)
+INDEX_PAGE = build_asset(
+    "index.html", TEMPLATES.get_template("index.html").render(), "text/html"
+)
+RESULT_TEMPLATE = TEMPLATES.get_template("result.html")
 
 
 @bentoml.service
@@ -32,7 +55,20 @@ class Bees:
         duration: int = 60,
         timeout: int | None = None,
         interval: int = 2,
+        rate: float | None = None,
+        burst: int = 1,
+        pacing: float | None = None,
     ) -> dict:
+        if interval <= 0:
+            return {"status": "error", "error": "Interval must be greater than 0"}
+        if rate is not None and rate <= 0:
+            return {"status": "error", "error": "Rate must be greater than 0"}
+        if pacing is not None and pacing <= 0:
+            return {"status": "error", "error": "Pacing must be greater than 0"}
+        try:
+            curlparser.parse(code)
+        except curlparser.CurlParseError as e:
+            return {"status": "error", "error": f"Invalid curl command: {e}"}
         result_id = str(uuid.uuid4())
         asyncio.create_task(
             _benchmark_controller(
@@ -42,6 +78,9 @@ class Bees:
                 duration,
                 timeout,
                 interval,
+                rate,
+                burst,
+                pacing,
             )
         )
         return {
@@ -51,50 +90,131 @@ class Bees:
 
     @bentoml.api
     async def stop_bento_benchmark(self, result_id: str) -> dict:
-        NOTI_STOPPING[result_id].set()
-        return {"status": "stopped"}
+        return {"status": _control_benchmark(result_id, "stop")}
 
     @bentoml.api
     async def pause_bento_benchmark(self, result_id: str) -> dict:
-        if NOTI_STOPPING[result_id].is_set():
-            return {"status": "stopped"}
-        NOTI_RUNNING[result_id].clear()
-        return {"status": "paused"}
+        return {"status": _control_benchmark(result_id, "pause")}
 
     @bentoml.api
     async def resume_bento_benchmark(self, result_id: str) -> dict:
-        if NOTI_STOPPING[result_id].is_set():
-            return {"status": "stopped"}
-        NOTI_RUNNING[result_id].set()
-        return {"status": "running"}
+        return {"status": _control_benchmark(result_id, "resume")}
 
 
 app = starlette.applications.Starlette()
 
 
+def _asset_response(
+    request, asset: StaticAsset, cache_control: str
+) -> starlette.responses.Response:
+    body, encoding, etag = asset.encoded(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return starlette.responses.Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return starlette.responses.Response(
+        body, media_type=asset.content_type, headers=headers
+    )
+
+
 @app.route("/")
-async def index(_):
-    return starlette.responses.HTMLResponse(jinja2.Template(TEMPLATE_INDEX).render())
+async def index(request):
+    return _asset_response(request, INDEX_PAGE, "no-cache")
+
+
+@app.route("/static/{name}")
+async def static(request):
+    asset = ASSETS.get(request.path_params["name"])
+    if asset is None:
+        return starlette.responses.Response(status_code=404)
+    if request.query_params.get("v") == asset.etag[1:13]:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = "no-cache"
+    return _asset_response(request, asset, cache_control)
 
 
 @app.route("/chart/{chart_id}")
 async def chart(request):
     chart_id = request.path_params["chart_id"]
-    return starlette.responses.HTMLResponse(
-        jinja2.Template(TEMPLATE_RESULT).render(
-            chart_id=chart_id,
-            plots=PLOTS_RESULT,
-        )
-    )
+    page = RESULT_TEMPLATE.render(chart_id=chart_id).encode("utf-8")
+    etag = f'"{hashlib.sha256(page).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return starlette.responses.Response(status_code=304, headers=headers)
+    return starlette.responses.HTMLResponse(page, headers=headers)
 
 
 @app.route("/chart/{chart_id}/stream")
 async def chart_stream(request):
     chart_id = request.path_params["chart_id"]
+    content = _stream_chart_data(chart_id)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if accepts_encoding(request.headers.get("accept-encoding", ""), "gzip"):
+        content = _gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
     return starlette.responses.StreamingResponse(
-        content=_stream_chart_data(chart_id),
+        content=content,
         media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+def _ws_connected(websocket: starlette.websockets.WebSocket) -> bool:
+    return (
+        websocket.application_state == starlette.websockets.WebSocketState.CONNECTED
+        and websocket.client_state == starlette.websockets.WebSocketState.CONNECTED
     )
 
 
+@app.websocket_route("/chart/{chart_id}/ws")
+async def chart_ws(websocket: starlette.websockets.WebSocket):
+    chart_id = websocket.path_params["chart_id"]
+    await websocket.accept()
+
+    async def send_frames():
+        async for frame in _stream_chart_frames(chart_id):
+            if not _ws_connected(websocket):
+                return
+            await websocket.send_bytes(frame)
+        if _ws_connected(websocket):
+            await websocket.close()
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            try:
+                reply = {
+                    "status": _control_benchmark(chart_id, message.get("text") or "")
+                }
+            except ValueError as e:
+                reply = {"error": str(e)}
+            if not _ws_connected(websocket):
+                return
+            await websocket.send_json(reply)
+
+    sender = asyncio.create_task(send_frames())
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        # the stream ending closes the socket, a disconnect ends the stream
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sender, receiver):
+            task.cancel()
+        results = await asyncio.gather(sender, receiver, return_exceptions=True)
+    for result in results:
+        # a client going away mid-send is expected, anything else is a bug
+        if isinstance(result, Exception) and not isinstance(
+            result, (starlette.websockets.WebSocketDisconnect, OSError)
+        ):
+            raise result
+
+
 Bees.mount_asgi_app(app)